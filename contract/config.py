@@ -3,18 +3,26 @@
 # Shared configuration.
 
 import os
+import sys
 import eth_account
 from web3 import Web3
 
 
 DIR_THIS = os.path.abspath(os.path.dirname(__file__))
 
+# Add the shared RPC provider to path.
+sys.path.append(f"{DIR_THIS}/../datasource/")
+from rpc_provider import get_web3
+
 CONTRACT="XRPMPT"
 
-# Target Chain RPC (using Ganache for testing).
-# WEB3_PROVIDER = 'HTTP://127.0.0.1:7545'
-WEB3_PROVIDER = 'https://rpc.sepolia.org'
-w3 = Web3(Web3.HTTPProvider(WEB3_PROVIDER))
+# Target Chain RPCs (using Ganache for testing).
+# WEB3_PROVIDERS = ['HTTP://127.0.0.1:7545']
+WEB3_PROVIDERS = [
+    'https://rpc.sepolia.org',
+    'https://ethereum-sepolia-rpc.publicnode.com',
+]
+w3 = get_web3(WEB3_PROVIDERS)
 
 
 # Contract's ABI and BIN.
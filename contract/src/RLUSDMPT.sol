@@ -1,5 +1,5 @@
 // SPDX-License-Identifier: MIT
-pragma solidity ^0.8.0;
+pragma solidity ^0.8.5;
 
 // Interface for UniSwap Router to interact with UniSwap V2 for token swaps.
 interface IUniswapV2Router02 {
@@ -25,6 +25,9 @@ interface IERC20 {
 }
 
 contract RLUSDMPT {
+    // Account allowed to publish weekly weights (the deployer).
+    address public owner;
+
     // UniSwap Router for token swaps.
     IUniswapV2Router02 public uniswapRouter;
 
@@ -52,8 +55,25 @@ contract RLUSDMPT {
     // Array to store the allocation percentages for each of the 2 assets.
     uint[2] public weights;
 
+    // Mapping from week number (timestamp / 1 weeks) to the allocation percentages for the 2 assets.
+    mapping(uint => uint[2]) public weeklyWeights;
+
+    // Size in bytes of a packed weekly record: uint32 week | uint8 weight_0 | uint8 weight_1.
+    uint constant WEEKLY_RECORD_SIZE = 6;
+
+    // Emitted for every weekly record stored, so backfills can be audited.
+    event WeeklyWeightsSet(uint indexed week, uint weight_0, uint weight_1);
+
+    // Restrict a function to the owner.
+    modifier onlyOwner() {
+        require(msg.sender == owner, "Caller is not the owner");
+        _;
+    }
+
     // Constructor initializes the contract with the rlusd token address, UniSwap router, and the asset token addresses.
     constructor() {
+        // The deployer owns the weekly weights.
+        owner = msg.sender;
         // Assign UniSwap router address.
         uniswapRouter = IUniswapV2Router02(uniswapRouterAddress);
     }
@@ -72,6 +92,23 @@ contract RLUSDMPT {
         weights = _weights;
     }
 
+    // Function to set the weights of many weeks in a single transaction.
+    // _packed is a concatenation of WEEKLY_RECORD_SIZE byte records (see above).
+    function setWeeklyWeights(bytes calldata _packed) external onlyOwner {
+        require(_packed.length % WEEKLY_RECORD_SIZE == 0, "Malformed weekly records");
+        for (uint i = 0; i < _packed.length; i += WEEKLY_RECORD_SIZE) {
+            // Unpack the record.
+            uint week = uint32(bytes4(_packed[i:i + 4]));
+            uint weight_0 = uint8(_packed[i + 4]);
+            uint weight_1 = uint8(_packed[i + 5]);
+            // Check that total weight is 100%.
+            require(weight_0 + weight_1 == 100, "Total weight must sum to 100%");
+            // Set the weights for the week.
+            weeklyWeights[week] = [weight_0, weight_1];
+            emit WeeklyWeightsSet(week, weight_0, weight_1);
+        }
+    }
+
     // Deposit function that allows a user to deposit rlusd and convert it into the 2 assets based on the set weights.
     function deposit(uint _rlusdAmount) external {
         // Transfer rlusd tokens from the user to the contract.
@@ -5,7 +5,7 @@
 import bz2
 import json
 
-from chainlink_config import DIR_THIS, DATE_TS_END, DATE_TS_START
+from chainlink_config import DIR_THIS, DATE_TS_END, DATE_TS_START, w3
 from chainlink_utils  import get_assets, get_feed, dt2ts
 
 
@@ -139,6 +139,9 @@ def gen_dataset():
         print(f"Saved data to json at: {fnf}")
         print("\n\n\n\n\n")
 
+    # Report how each RPC endpoint performed.
+    w3.provider.print_stats()
+
 
 if __name__ == "__main__":
     gen_dataset()
@@ -1,7 +1,7 @@
 import os
 import json
 
-from web3 import Web3
+from rpc_provider import get_web3
 
 DIR_THIS = os.path.abspath(os.path.dirname(__file__))
 
@@ -9,13 +9,16 @@ DIR_THIS = os.path.abspath(os.path.dirname(__file__))
 # https://chainlist.org/chain/1
 
 # Ethereum:
-# WEB3_PROVIDER = 'https://eth.llamarpc.com'
-
-# Arbitrum:
-# WEB3_PROVIDER = 'https://arbitrum.llamarpc.com'
-WEB3_PROVIDER = 'https://arb-mainnet.g.alchemy.com/v2/3S8ZPGXd0mebA3AQwN0UABHj9ndTdci1'
-w3 = Web3(Web3.HTTPProvider(WEB3_PROVIDER))
-print(f"Web3 provider: {WEB3_PROVIDER}")
+# WEB3_PROVIDERS = ['https://eth.llamarpc.com']
+
+# Arbitrum (requests are routed to the fastest healthy endpoint):
+WEB3_PROVIDERS = [
+    'https://arb-mainnet.g.alchemy.com/v2/3S8ZPGXd0mebA3AQwN0UABHj9ndTdci1',
+    'https://arbitrum.llamarpc.com',
+    'https://arb1.arbitrum.io/rpc',
+]
+w3 = get_web3(WEB3_PROVIDERS)
+print(f"Web3 providers: {', '.join(WEB3_PROVIDERS)}")
 
 # BTC/USD (Ethereum) | btc-usd.data.eth
 # Got this Address/ABI from:
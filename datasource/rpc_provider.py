@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+
+# Pooled, failover-aware RPC provider shared by datasource and contract.
+#
+# Each chain is configured with several endpoints. Every endpoint keeps a
+# persistent HTTP session (keep-alive connection pool), requests are routed to
+# the fastest healthy endpoint, failures are retried on the next one with a
+# jittered backoff, and endpoints that keep failing are skipped for a while by
+# a circuit breaker (a single probe is let through once it cools down).
+# Endpoints are ranked by latency plus their recent error rate times the cost
+# of a failure there (its duration plus the backoff); the error rate fades with
+# time. Transactions are never sent twice: sends are only
+# retried when the request could not reach the node, or when the transaction
+# is not found on chain. Per-endpoint latency and error counts are available
+# from get_stats() / print_stats().
+#
+# Run this file to exercise it against local stand-in RPC servers.
+
+import json
+import time
+import random
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from web3 import Web3
+from web3.exceptions import ProviderConnectionError
+from web3.providers.base import JSONBaseProvider
+
+
+# HTTP statuses worth retrying on another endpoint (rate limited / server errors).
+RETRY_HTTP_STATUS = (429, 500, 502, 503, 504)
+
+# JSON-RPC error codes worth retrying on another endpoint (limit exceeded).
+RETRY_RPC_CODES = (-32005,)
+
+# Weight of the latest sample in the latency and error rate moving averages.
+LATENCY_EWMA = 0.3
+
+# Recent error rate at which the circuit breaker opens.
+ERROR_RATE_MAX = 0.5
+
+# Seconds for the error rate of an endpoint to halve when it sees no errors.
+ERROR_HALF_LIFE = 5
+
+# Methods that are not safe to repeat once the node may have received them.
+SEND_METHODS = ('eth_sendRawTransaction', 'eth_sendTransaction')
+
+
+# Also an OSError, which is what web3's is_connected() checks for.
+class RPCEndpointError(ProviderConnectionError, OSError):
+    pass
+
+
+class Endpoint:
+    # A single RPC endpoint: its HTTP session, circuit breaker and statistics.
+
+    def __init__(self, uri, pool_size, failure_threshold, cooldown):
+        self.uri = uri
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+        # Persistent session, connections are kept alive and reused.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.latency = None
+        self.fail_latency = None
+        self._error_rate = 0.0
+        self._error_rate_at = time.monotonic()
+        self.last_error = None
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return 'open'
+        # Cooldown elapsed, let requests probe the endpoint again.
+        return 'half-open'
+
+    def acquire(self):
+        # Whether a request may use the endpoint, only one probe while half-open.
+        with self._lock:
+            state = self.state()
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    @property
+    def error_rate(self):
+        # Recent error rate, fading with the time since it was last updated.
+        return self._error_rate * 0.5 ** ((time.monotonic() - self._error_rate_at) / ERROR_HALF_LIFE)
+
+    def score(self, backoff):
+        # Expected cost of a request: its latency, plus the cost of a failure
+        # (how long failures take here and the backoff before the retry) for
+        # the share of requests that fail. Untested endpoints score 0.
+        return (self.latency or 0) + self.error_rate * ((self.fail_latency or 0) + backoff)
+
+    def _record_error_rate(self, error):
+        error_rate = self.error_rate
+        self._error_rate = error_rate + LATENCY_EWMA * (error - error_rate)
+        self._error_rate_at = time.monotonic()
+
+    def record_success(self, latency):
+        with self._lock:
+            self.requests += 1
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += LATENCY_EWMA * (latency - self.latency)
+            self._record_error_rate(0)
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_error(self, error, latency):
+        with self._lock:
+            self.requests += 1
+            if self.fail_latency is None:
+                self.fail_latency = latency
+            else:
+                self.fail_latency += LATENCY_EWMA * (latency - self.fail_latency)
+            self._record_error_rate(1)
+            self.probing = False
+            self.errors += 1
+            self.last_error = str(error)
+            self.failures += 1
+            if self.failures >= self.failure_threshold or self.error_rate >= ERROR_RATE_MAX:
+                # (Re)open the breaker, a failed half-open probe restarts the cooldown.
+                self.opened_at = time.monotonic()
+
+    def post(self, data, timeout):
+        response = self.session.post(
+            self.uri,
+            data=data,
+            headers={'Content-Type': 'application/json'},
+            timeout=timeout,
+        )
+        if response.status_code in RETRY_HTTP_STATUS:
+            raise RPCEndpointError(f"HTTP {response.status_code}")
+        response.raise_for_status()
+        decoded = JSONBaseProvider.decode_rpc_response(response.content)
+        if isinstance(decoded, dict) and decoded.get('error', {}).get('code') in RETRY_RPC_CODES:
+            raise RPCEndpointError(f"RPC error: {decoded['error']}")
+        return decoded
+
+
+class PooledHTTPProvider(JSONBaseProvider):
+    # Web3 provider that spreads requests over several endpoints of one chain.
+
+    def __init__(self, endpoint_uris, timeout=10, retries=3, backoff=0.25, backoff_max=4,
+                 pool_size=16, failure_threshold=5, cooldown=30):
+        super().__init__()
+        if not endpoint_uris:
+            raise ValueError("At least one RPC endpoint is required")
+        self.endpoints = [Endpoint(uri, pool_size, failure_threshold, cooldown) for uri in endpoint_uris]
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+
+    def __str__(self):
+        return f"PooledHTTPProvider({', '.join(e.uri for e in self.endpoints)})"
+
+    def _pick(self, tried):
+        # Fastest usable endpoint not tried yet, untested endpoints come first.
+        for endpoints in ([e for e in self.endpoints if e not in tried], self.endpoints):
+            for endpoint in sorted(endpoints, key=lambda e: e.score(self.backoff)):
+                if endpoint.acquire():
+                    return endpoint
+        return None
+
+    def _post(self, data, sent_check=None):
+        # sent_check is given for sends, it returns a response when the
+        # transaction reached the chain, None when it is safe to send again.
+        tried = set()
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                # Full jitter exponential backoff.
+                time.sleep(random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt)))
+            endpoint = self._pick(tried)
+            if endpoint is None:
+                error = RPCEndpointError("Every RPC endpoint has its circuit breaker open")
+                continue
+            tried.add(endpoint)
+            t_start = time.monotonic()
+            try:
+                response = endpoint.post(data, self.timeout)
+            except (requests.RequestException, ValueError, RPCEndpointError) as e:
+                endpoint.record_error(e, time.monotonic() - t_start)
+                error = e
+                if sent_check and not _before_send(e):
+                    # The node may have the transaction, only send it again if it has not.
+                    response = sent_check()
+                    if response is not None:
+                        return response
+                continue
+            finally:
+                endpoint.probing = False
+            endpoint.record_success(time.monotonic() - t_start)
+            if sent_check and attempt and 'error' in response:
+                # A resend rejected as known / nonce too low, check it landed.
+                return sent_check() or response
+            return response
+        raise RPCEndpointError(f"All RPC attempts failed, last error: {error}")
+
+    def make_request(self, method, params):
+        data = self.encode_rpc_request(method, params)
+        if method == 'eth_sendRawTransaction':
+            return self._post(data, lambda: self._find_transaction(data, params[0]))
+        if method in SEND_METHODS:
+            # The transaction hash is unknown before the node signs it, never resend.
+            return self._post(data, lambda: _raise(RPCEndpointError(
+                f"{method} may have reached the node, not sending it again")))
+        return self._post(data)
+
+    def _find_transaction(self, data, raw_transaction):
+        # Response for a sent transaction when it is known on chain, else None.
+        tx_hash = Web3.to_hex(Web3.keccak(hexstr=raw_transaction) if isinstance(raw_transaction, str)
+                              else Web3.keccak(raw_transaction))
+        try:
+            found = self._post(self.encode_rpc_request('eth_getTransactionByHash', [tx_hash]))
+        except RPCEndpointError as e:
+            raise RPCEndpointError(f"Transaction {tx_hash} may have been sent, unable to check: {e}")
+        if 'error' in found:
+            raise RPCEndpointError(f"Transaction {tx_hash} may have been sent, unable to check: {found['error']}")
+        if found.get('result') is None:
+            return None
+        return {'jsonrpc': '2.0', 'id': json.loads(data)['id'], 'result': tx_hash}
+
+    def make_batch_request(self, batch_requests):
+        response = self._post(self.encode_batch_rpc_request(batch_requests))
+        if not isinstance(response, list):
+            # RPC errors return only one response with the error object.
+            return response
+        return sorted(response, key=lambda r: r.get('id', 0))
+
+    def get_stats(self):
+        return [{
+            'uri': e.uri,
+            'state': e.state(),
+            'requests': e.requests,
+            'errors': e.errors,
+            'latency_ms': None if e.latency is None else round(e.latency * 1000, 2),
+            'error_rate': round(e.error_rate, 3),
+            'last_error': e.last_error,
+        } for e in self.endpoints]
+
+    def print_stats(self):
+        for s in self.get_stats():
+            latency = '-' if s['latency_ms'] is None else f"{s['latency_ms']:.2f}"
+            print(f"{s['uri']:>50s} | {s['state']:>9s} | requests {s['requests']:>6d}"
+                  f" | errors {s['errors']:>5d} ({s['error_rate']:5.1%}) | latency {latency:>8s} ms")
+
+
+def _before_send(error):
+    # Whether the request failed before reaching the node (no connection made).
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(error, requests.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+def _raise(error):
+    raise error
+
+
+# Providers are shared per set of endpoints and settings, so are their connection pools.
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(endpoint_uris, **kwargs):
+    key = (tuple(endpoint_uris), tuple(sorted(kwargs.items())))
+    with _providers_lock:
+        if key not in _providers:
+            _providers[key] = PooledHTTPProvider(list(endpoint_uris), **kwargs)
+        return _providers[key]
+
+
+def get_web3(endpoint_uris, **kwargs):
+    return Web3(get_provider(endpoint_uris, **kwargs))
+
+
+def _stand_in_rpc(delay=0.0, error_rate=0.0, chain=None):
+    # Local stand-in RPC server that injects delays and errors, they can be
+    # changed while it runs (server.delay, server.send_delay for transactions
+    # only, server.error_rate). Transactions
+    # sent to it are counted in chain (shared by the stand-ins of one chain).
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Buffer the response, avoiding small writes on the kept-alive socket.
+        wbufsize = -1
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            result = '0x1'
+            if request['method'] == 'eth_sendRawTransaction':
+                # The node accepts the transaction, even if it answers late.
+                result = Web3.to_hex(Web3.keccak(hexstr=request['params'][0]))
+                self.server.chain[result] = self.server.chain.get(result, 0) + 1
+                time.sleep(self.server.send_delay)
+            elif request['method'] == 'eth_getTransactionByHash':
+                tx_hash = request['params'][0]
+                result = {'hash': tx_hash} if tx_hash in self.server.chain else None
+            time.sleep(self.server.delay)
+            if random.random() < self.server.error_rate:
+                code, body = 503, b'{}'
+            else:
+                code = 200
+                body = json.dumps({'jsonrpc': '2.0', 'id': request['id'], 'result': result}).encode()
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.delay = delay
+    server.send_delay = 0
+    server.error_rate = error_rate
+    server.chain = {} if chain is None else chain
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def validate():
+    # A slow endpoint, a flaky endpoint, a fast one and one that is down.
+    chain = {}
+    servers = [
+        _stand_in_rpc(delay=0.2, chain=chain),
+        _stand_in_rpc(error_rate=0.5, chain=chain),
+        _stand_in_rpc(delay=0.01, chain=chain),
+    ]
+    uris = [uri for _, uri in servers] + ['http://127.0.0.1:9']
+    w3 = get_web3(uris, timeout=1, backoff=0.01, failure_threshold=3, cooldown=5)
+
+    def run(n):
+        t_start = time.time()
+        for _ in range(n):
+            w3.provider.make_request('eth_chainId', [])
+        print(f"Made {n} requests in {time.time() - t_start:.2f}s.")
+        w3.provider.print_stats()
+
+    run(200)
+
+    # The fast endpoint degrades to timeouts, requests move to the slow one.
+    print("Fast endpoint now times out:")
+    servers[2][0].delay = 2
+    run(50)
+
+    # Once it recovers its error penalty fades and requests move back to it.
+    print(f"Fast endpoint recovered, {2 * ERROR_HALF_LIFE}s later:")
+    servers[2][0].delay = 0.01
+    time.sleep(2 * ERROR_HALF_LIFE)
+    run(50)
+
+    # A transaction accepted by a node that answers too late is not sent again.
+    for server, _ in servers:
+        server.send_delay = 2
+    response = w3.provider.make_request('eth_sendRawTransaction', ['0x01'])
+    print(f"Slow send returned {response['result']}, broadcast {sum(chain.values())} time(s).")
+
+    # With only dead endpoints the provider reports it is not connected.
+    print(f"Connected to dead endpoints: {get_web3(['http://127.0.0.1:9'], backoff=0.01).is_connected()}")
+
+    for server, _ in servers:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    validate()
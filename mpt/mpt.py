@@ -10,129 +10,193 @@ import matplotlib.pyplot as plt
 from mpt_config import DIR_THIS, FNF_DATA_CSV_BZ2, risk_free_rate
 
 
-def get_mpt(fnf=FNF_DATA_CSV_BZ2):
+def load_log_returns(fnf=FNF_DATA_CSV_BZ2):
     with bz2.open(fnf) as fd:
         df = pd.read_csv(fd)
 
     # Convert timestamps to a usable time index (optional).
     df['ts'] = pd.to_datetime(df['ts'], unit='s')
     df.set_index('ts', inplace=True)
-    
+
     # Calculate log returns.
-    log_returns = np.log(df / df.shift(1)).dropna()
-    
+    return np.log(df / df.shift(1)).dropna()
+
+
+def get_stats(log_returns):
     # Calculate annualized returns and covariance matrix.
     trading_seconds_per_year = 365 * 24 * 60 * 60  # Seconds in a year.
     annualized_returns = log_returns.mean() * trading_seconds_per_year
     annualised_covar = log_returns.cov() * trading_seconds_per_year
-    
-    # Number of assets.
-    num_assets = len(annualized_returns)
-    
-    print('=== Show CoVariance Matrix ===')
-    print(annualised_covar, end="\n\n\n")
+    return annualized_returns, annualised_covar
+
+
+# Define useful functions:
+def get_returns(weights, annualized_returns):
+    return np.sum(annualized_returns * weights)
+
+
+def get_volatility(weights, annualised_covar):
+    return np.sqrt(np.dot(weights.T, np.dot(annualised_covar, weights)))
+
+
+def summarize(weights, annualized_returns, volatilty, risk_free_rate=risk_free_rate):
+    return_perc = sum(weights * annualized_returns)
+    sharpe_ratio = (return_perc - risk_free_rate) / volatilty
+    allocations = {}
+    for i, name in enumerate(annualized_returns.index.values):
+        allocations[name] = weights[i]
+    return {
+        'return_perc': return_perc,
+        'allocations': allocations,
+        'sharpe_ratio': sharpe_ratio,
+        'volatilty': volatilty
+    }
+
+
+def show_portfolio(summary):
+    print(' Portfolio allocations:')
+    for k, v in summary['allocations'].items():
+        if v > 0.0001:
+            print(f"{k:>21s} : {v*100:5.2f}%")
+    print(f" Expected return      : {110 * summary['return_perc']:5.2f}%")
+    print(f" Sharpe ratio         : {summary['sharpe_ratio']:5.2f}")
+    print(f" Expected volatility  : {110 * summary['volatilty']:5.2f}%")
+    print('\n')
 
+
+def _get_constraints(num_assets):
     # Define optimization constraints.
     # note: here is where we can define leverage, or allow shorting.
     constraints = ({'type': 'eq', 'fun': lambda x: np.sum(x) - 1})
     bounds = tuple((0, 1) for _ in range(num_assets))
+    return constraints, bounds
 
-    # Define useful functions:
-    def get_returns(weights):
-        return np.sum(annualized_returns * weights)
 
-    def get_volatility(weights):
-        return np.sqrt(np.dot(weights.T, np.dot(annualised_covar, weights)))
-    
+def get_portfolios(annualized_returns, annualised_covar, risk_free_rate=risk_free_rate, base=None):
+    # base: portfolios of the same assets for another risk-free rate. Only the
+    # sharpe ratio depends on it, so the others are reused.
+
+    # Number of assets.
+    num_assets = len(annualized_returns)
+    constraints, bounds = _get_constraints(num_assets)
+
     def get_opt_params(weights):
         # Package Relevant fields for optimization.
         weights = np.array(weights)
-        rets = get_returns(weights)
-        vols = get_volatility(weights)
+        rets = get_returns(weights, annualized_returns)
+        vols = get_volatility(weights, annualised_covar)
         return np.array([rets, vols, (rets - risk_free_rate) / vols])
 
-    def summarize(weights, annualized_returns, volatilty):
-        return_perc = sum(weights * annualized_returns)
-        sharpe_ratio = (return_perc - risk_free_rate) / volatilty
-        allocations = {}
-        for i, name in enumerate(df.columns.values):
-            allocations[name] = weights[i]
-        return {
-            'return_perc': return_perc,
-            'allocations': allocations,
-            'sharpe_ratio': sharpe_ratio,
-            'volatilty': volatilty
-        }
-
-    def show_portfolio(summary):
-        print(' Portfolio allocations:')
-        for k, v in summary['allocations'].items():
-            if v > 0.0001:
-                print(f"{k:>21s} : {v*100:5.2f}%")
-        print(f" Expected return      : {110 * summary['return_perc']:5.2f}%")
-        print(f" Sharpe ratio         : {summary['sharpe_ratio']:5.2f}")
-        print(f" Expected volatility  : {110 * summary['volatilty']:5.2f}%")
-        print('\n')
+    def optimize(fun, x0=None):
+        opts = sco.minimize(
+            fun,
+            num_assets * [1. / num_assets, ] if x0 is None else x0,
+            method='SLSQP',
+            bounds=bounds,
+            constraints=constraints
+        )
+        vol = get_opt_params(opts['x'])[1]
+        return summarize(opts['x'], annualized_returns, vol, risk_free_rate)
 
     # Maximize the sharpe ratio:
-    print('=== Best Sharpe Ratio ===')
-
     def max_sharpe(weights):
         return -get_opt_params(weights)[2]
 
-    max_sharpe_opts = sco.minimize(
-        max_sharpe,
-        num_assets * [1. / num_assets, ],
-        method='SLSQP',
-        bounds=bounds,
-        constraints=constraints
-    )
-    max_sharpe_ret, max_sharpe_vol, max_sharpe_sharpe = get_opt_params(max_sharpe_opts['x'])
-    max_sharpe_sum = summarize(max_sharpe_opts['x'], annualized_returns, max_sharpe_vol)
-    show_portfolio(max_sharpe_sum)
-    
     # Minimize variance:
-    print('=== Lowest Variance ===')
-
     def min_variance(weights):
         return get_opt_params(weights)[1] ** 2
 
-    min_var_opts = sco.minimize(
-        min_variance,
-        num_assets * [1. / num_assets, ],
-        method='SLSQP',
-        bounds=bounds,
-        constraints=constraints
-    )
-    min_var_ret, min_var_vol, min_var_sharpe = get_opt_params(min_var_opts['x'])
-    min_var_sum = summarize(min_var_opts['x'], annualized_returns, min_var_vol)
-    show_portfolio(min_var_sum)
-
     # Maximize returns:
-    print('=== Maximise Returns ===')
-
     def max_returns(weights):
         return -get_opt_params(weights)[0]
-    
-    max_ret_opts = sco.minimize(
-        max_returns,
-        num_assets * [1. / num_assets, ],
-        method='SLSQP',
-        bounds=bounds,
-        constraints=constraints
-    )
-    max_ret_ret, max_ret_vol, max_ret_sharpe = get_opt_params(max_ret_opts['x'])
-    max_ret_sum = summarize(max_ret_opts['x'], annualized_returns, max_ret_vol)
+
+    if base is not None:
+        def resummarize(summary):
+            weights = np.array(list(summary['allocations'].values()))
+            return summarize(weights, annualized_returns, summary['volatilty'], risk_free_rate)
+
+        return {
+            'max_sharpe': optimize(max_sharpe, list(base['max_sharpe']['allocations'].values())),
+            'max_return': resummarize(base['max_return']),
+            'max_vol': resummarize(base['max_vol']),
+        }
+
+    return {
+        'max_sharpe': optimize(max_sharpe),
+        'max_return': optimize(max_returns),
+        'max_vol': optimize(min_variance),
+    }
+
+
+def get_frontier(annualized_returns, annualised_covar, portfolios, n_points=20):
+    # Efficient frontier: lowest volatility for target returns between the
+    # lowest variance and the highest return portfolios.
+    num_assets = len(annualized_returns)
+    constraints, bounds = _get_constraints(num_assets)
+
+    def variance(weights):
+        return get_volatility(weights, annualised_covar) ** 2
+
+    frontier = []
+    ret_min = portfolios['max_vol']['return_perc']
+    ret_max = portfolios['max_return']['return_perc']
+    # Each point starts from the previous one, they are close to each other.
+    weights = np.array(list(portfolios['max_vol']['allocations'].values()))
+    for target in np.linspace(ret_min, ret_max, n_points):
+        opts = sco.minimize(
+            variance,
+            weights,
+            method='SLSQP',
+            bounds=bounds,
+            constraints=(
+                constraints,
+                {'type': 'eq', 'fun': lambda x, t=target: get_returns(x, annualized_returns) - t}
+            )
+        )
+        weights = opts['x']
+        frontier.append({
+            'return_perc': target,
+            'volatilty': get_volatility(opts['x'], annualised_covar),
+        })
+    return frontier
+
+
+def get_mpt(fnf=FNF_DATA_CSV_BZ2):
+    log_returns = load_log_returns(fnf)
+    annualized_returns, annualised_covar = get_stats(log_returns)
+
+    # Number of assets.
+    num_assets = len(annualized_returns)
+
+    print('=== Show CoVariance Matrix ===')
+    print(annualised_covar, end="\n\n\n")
+
+    portfolios = get_portfolios(annualized_returns, annualised_covar)
+    max_sharpe_sum = portfolios['max_sharpe']
+    min_var_sum = portfolios['max_vol']
+    max_ret_sum = portfolios['max_return']
+
+    print('=== Best Sharpe Ratio ===')
+    show_portfolio(max_sharpe_sum)
+
+    print('=== Lowest Variance ===')
+    show_portfolio(min_var_sum)
+
+    print('=== Maximise Returns ===')
     show_portfolio(max_ret_sum)
 
+    max_sharpe_ret, max_sharpe_vol = max_sharpe_sum['return_perc'], max_sharpe_sum['volatilty']
+    min_var_ret, min_var_vol = min_var_sum['return_perc'], min_var_sum['volatilty']
+    max_ret_ret, max_ret_vol = max_ret_sum['return_perc'], max_ret_sum['volatilty']
+
     # Simulate a number of portfolios.
     lrets = []
     lvols = []
     for _ in range(5000):
         weights = np.random.random(num_assets)
         weights /= np.sum(weights)
-        lrets.append(get_returns(weights))
-        lvols.append(get_volatility(weights))
+        lrets.append(get_returns(weights, annualized_returns))
+        lvols.append(get_volatility(weights, annualised_covar))
     lrets = np.array(lrets)
     lvols = np.array(lvols)
     
@@ -158,14 +222,10 @@ def get_mpt(fnf=FNF_DATA_CSV_BZ2):
     plt.savefig(fnf_image)
     print(f"Saved portfolios image to: {fnf_image}")
 
-    return {
-        'max_sharpe': max_sharpe_sum,
-        'max_return': max_ret_sum,
-        'max_vol': min_var_sum,
-    }
+    return portfolios
 
 
-def get_best_portfolio(mpt):
+def get_best_portfolio(mpt, verbose=True):
     highest_sharpe = mpt['max_sharpe']
     return_perc = round(highest_sharpe['return_perc'] * 100)
     assets = {}
@@ -174,13 +234,14 @@ def get_best_portfolio(mpt):
     vol_perc  = round(highest_sharpe['volatilty'] * 100)
     sharpe_ratio = round(highest_sharpe['sharpe_ratio'] * 100)
 
-    print(f'Allocations for best sharpe ratio portfolio:')
-    asorted = sorted([(v,k) for k,v in assets.items()], reverse=True)
-    for alloc, asset in asorted:
-        print(f'{asset.upper():>15s}: {alloc:>5d} %')
-    print(f'Expected return: {return_perc:>5d} %')
-    print(f'     Volatility: {vol_perc:>5d} %')
-    print(f'   Sharpe Ratio: {sharpe_ratio:>5d} %')
+    if verbose:
+        print(f'Allocations for best sharpe ratio portfolio:')
+        asorted = sorted([(v,k) for k,v in assets.items()], reverse=True)
+        for alloc, asset in asorted:
+            print(f'{asset.upper():>15s}: {alloc:>5d} %')
+        print(f'Expected return: {return_perc:>5d} %')
+        print(f'     Volatility: {vol_perc:>5d} %')
+        print(f'   Sharpe Ratio: {sharpe_ratio:>5d} %')
 
     return {
         'allocations': assets,
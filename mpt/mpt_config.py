@@ -10,3 +10,10 @@ FNF_DATA_CSV_BZ2 = f"{DIR_THIS}/data/ts.csv.bz2"
 
 # Risk-free rate (for Sharpe ratio). Using 0 for simplicity.
 risk_free_rate = 0.00
+
+# Portfolio query service (mpt_server.py), bound to localhost.
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8000
+
+# Seconds between checks for a new CSV file to reload.
+SERVER_RELOAD_SECS = 30
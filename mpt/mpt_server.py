@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+
+# Long running portfolio query service.
+#
+# Keeps the dataset, its statistics and the optimized portfolios in memory and
+# answers queries over a local HTTP API. The CSV file is reloaded in the
+# background whenever it changes.
+#
+# Endpoints (JSON):
+#   /assets
+#   /best        ?risk_free_rate=0.01&assets=btc,eth
+#   /portfolios  ?risk_free_rate=0.01&assets=btc,eth
+#   /frontier    ?points=20&assets=btc,eth   (points up to FRONTIER_POINTS)
+#   /covariance  ?assets=btc,eth
+
+import os
+import json
+import math
+import time
+import threading
+import numpy as np
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from mpt_config import (
+    FNF_DATA_CSV_BZ2,
+    SERVER_HOST,
+    SERVER_PORT,
+    SERVER_RELOAD_SECS,
+    risk_free_rate
+)
+from mpt import (
+    load_log_returns,
+    get_stats,
+    get_portfolios,
+    get_frontier,
+    get_best_portfolio
+)
+
+
+# Maximum number of what-if results kept per dataset.
+CACHE_SIZE = 256
+
+# Points of the precomputed frontiers, requests get evenly spaced points of it.
+FRONTIER_POINTS = 100
+
+
+class Snapshot:
+    # Statistics of one version of the dataset, what-if results are cached.
+
+    def __init__(self, fnf):
+        self.mtime = os.path.getmtime(fnf)
+        self.annualized_returns, self.annualised_covar = get_stats(load_log_returns(fnf))
+        self.assets = list(self.annualized_returns.index.values)
+        self._cache = {}
+        self._lock = threading.Lock()
+        # Warm up the default queries (this runs in the reload thread).
+        self.portfolios(risk_free_rate, self.assets)
+        self.frontier(FRONTIER_POINTS, self.assets)
+
+    def _cached(self, key, fun):
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+        value = fun()
+        with self._lock:
+            if len(self._cache) >= CACHE_SIZE:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[key] = value
+        return value
+
+    def _subset(self, assets):
+        return (
+            self.annualized_returns[assets],
+            self.annualised_covar.loc[assets, assets]
+        )
+
+    def portfolios(self, rfr, assets):
+        if rfr == risk_free_rate:
+            return self._cached(
+                ('portfolios', rfr, tuple(assets)),
+                lambda: get_portfolios(*self._subset(assets), rfr)
+            )
+        # Other rates start from the default portfolios, only the sharpe ratio changes.
+        base = self.portfolios(risk_free_rate, assets)
+        return self._cached(
+            ('portfolios', rfr, tuple(assets)),
+            lambda: get_portfolios(*self._subset(assets), rfr, base=base)
+        )
+
+    def frontier(self, n_points, assets):
+        # The dense frontier is computed once per set of assets, then sliced.
+        frontier = self._cached(
+            ('frontier', tuple(assets)),
+            lambda: get_frontier(*self._subset(assets), self.portfolios(risk_free_rate, assets), FRONTIER_POINTS)
+        )
+        return [frontier[i] for i in np.linspace(0, FRONTIER_POINTS - 1, n_points).round().astype(int)]
+
+    def covariance(self, assets):
+        return self._subset(assets)[1].to_dict()
+
+
+class PortfolioService:
+    # Holds the current snapshot and swaps it when the dataset changes.
+
+    def __init__(self, fnf=FNF_DATA_CSV_BZ2, reload_secs=SERVER_RELOAD_SECS):
+        self.fnf = fnf
+        self.reload_secs = reload_secs
+        self.snapshot = Snapshot(fnf)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def reload(self):
+        # Build the new snapshot aside, queries keep using the old one meanwhile.
+        try:
+            if os.path.getmtime(self.fnf) != self.snapshot.mtime:
+                print(f"Reloading data from: {self.fnf}")
+                self.snapshot = Snapshot(self.fnf)
+        except Exception as e:
+            print(f"Error reloading data: {e}")
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_secs):
+            self.reload()
+
+
+def _parse_query(snapshot, query):
+    assets = snapshot.assets
+    if 'assets' in query:
+        # Remove duplicates, keeping the order.
+        assets = list(dict.fromkeys(a.strip().lower() for a in query['assets'][0].split(',') if a.strip()))
+        unknown = [a for a in assets if a not in snapshot.assets]
+        if unknown:
+            raise ValueError(f"Unknown assets: {','.join(unknown)}")
+        if not assets:
+            raise ValueError("No assets selected")
+    rfr = float(query.get('risk_free_rate', [risk_free_rate])[0])
+    if not math.isfinite(rfr):
+        raise ValueError("risk_free_rate must be a finite number")
+    points = int(query.get('points', [20])[0])
+    if not 2 <= points <= FRONTIER_POINTS:
+        raise ValueError(f"points must be between 2 and {FRONTIER_POINTS}")
+    return assets, rfr, points
+
+
+def make_handler(service):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def _send(self, code, body):
+            # Body is either an object or the JSON already encoded.
+            data = (body if isinstance(body, str) else json.dumps(body, default=float)).encode()
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            snapshot = service.snapshot
+            try:
+                assets, rfr, points = _parse_query(snapshot, parse_qs(url.query))
+            except ValueError as e:
+                return self._send(400, {'error': str(e)})
+
+            try:
+                if url.path == '/assets':
+                    body = snapshot.assets
+                elif url.path == '/best':
+                    body = get_best_portfolio(snapshot.portfolios(rfr, assets), verbose=False)
+                elif url.path == '/portfolios':
+                    body = snapshot.portfolios(rfr, assets)
+                elif url.path == '/frontier':
+                    body = snapshot.frontier(points, assets)
+                elif url.path == '/covariance':
+                    body = snapshot.covariance(assets)
+                else:
+                    return self._send(404, {'error': f"Unknown endpoint: {url.path}"})
+                data = json.dumps(body, default=float)
+            except Exception as e:
+                print(f"Error serving {self.path}: {e}")
+                return self._send(500, {'error': f"Internal error: {e}"})
+            self._send(200, data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(host=SERVER_HOST, port=SERVER_PORT):
+    t_start = time.time()
+    service = PortfolioService()
+    service.start()
+    print(f"Loaded {len(service.snapshot.assets)} assets in {time.time() - t_start:.2f}s.")
+
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"Serving portfolios at: http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    serve()